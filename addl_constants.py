@@ -0,0 +1,95 @@
+"""Column layout and dropdown options shared by the ADDL Issue Tracker."""
+
+# ---------- SHEET COLUMNS ----------
+EXPECTED_COLUMNS = [
+    "Issue ID",
+    "Date Reported",
+    "Reported By",
+    "Category",
+    "Subcategory",
+    "Lab Section",
+    "Species",
+    "Description",
+    "Action Taken",
+    "Resolution Date",
+    "Notes",
+]
+
+# ---------- STATIC DROPDOWNS ----------
+# Tuples: immutable, and kept in the order they should appear in the UI
+CATEGORIES = ("Mailing Room", "Client Communication", "Lab Section", "Other")
+
+LAB_SECTIONS = (
+    "Avian",
+    "Bacteriology",
+    "Canine Genetics",
+    "Contracted Tests",
+    "Histology",
+    "IHC - Obsolete DON'T USE",
+    "Molecular Diagnostics",
+    "Other Services",
+    "Parasitology",
+    "Pathology",
+    "Proficiency Tests",
+    "Serology",
+    "SIPAC Avian",
+    "SIPAC Bacteriology",
+    "SIPAC Parasitology",
+    "SIPAC Virology",
+    "Special Stains-Obsolete",
+    "Toxicology",
+    "TSE",
+    "Virology",
+)
+
+SPECIES = (
+    "Cervid",
+    "Avian",
+    "Bovine",
+    "Canine",
+    "Equine",
+    "Feline",
+    "Caprine",
+    "Lab An.",
+    "Camelid",
+    "Non An.",
+    "Ovine",
+    "Porcine",
+    "Aquatic",
+    "Unspecified",
+    "Unknown",
+    "Miscellaneous",
+)
+
+MAILING_ROOM_ISSUES = (
+    "Missing Sample",
+    "Missing Submission Form",
+    "Broken Sample",
+    "Broken Box",
+    "Inappropriate Specimen",
+    "No/Incorrect Test Marked",
+    "No/Incorrect Species Marked",
+    "No History",
+    "Blank Submission Form",
+    "No/Incorrect Premise ID",
+    "Check",
+    "No Owner",
+    "No Vet",
+    "Test Suggestion",
+    "Other",
+)
+
+CLIENT_COMM_ISSUES = (
+    "Result Interpretation",
+    "Turnaround Time",
+    "Sample Submission",
+    "Consultation for Testing",
+    "Fees",
+    "Other",
+)
+
+# Categories that require picking at least one issue type
+SUBCATEGORY_OPTIONS = {
+    "Mailing Room": MAILING_ROOM_ISSUES,
+    "Client Communication": CLIENT_COMM_ISSUES,
+}
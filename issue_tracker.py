@@ -1,12 +1,28 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from datetime import datetime
+import gzip
 import io
+import openpyxl
+import random
+import threading
+import time
 import pytz
 
 
 import gspread
+from gspread.utils import a1_to_rowcol, absolute_range_name, rowcol_to_a1
 from google.oauth2.service_account import Credentials
+
+from addl_constants import (
+    CATEGORIES,
+    EXPECTED_COLUMNS,
+    LAB_SECTIONS,
+    SPECIES,
+    SUBCATEGORY_OPTIONS,
+)
 LOCAL_TZ = pytz.timezone("America/Indiana/Indianapolis")
 
 # ---------- GOOGLE SHEETS SETUP ----------
@@ -15,139 +31,311 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive",
 ]
 
-# uses secrets.toml: [gcp_service_account] {...}
-creds = Credentials.from_service_account_info(
-    st.secrets["gcp_service_account"],
-    scopes=SCOPES,
-)
-client = gspread.authorize(creds)
-
 SHEET_NAME = "shared_issues"  # Google Sheet name (tab 1)
+# optional in secrets.toml: sheet_id = "..." (the ID from the sheet's URL)
+
+
+def _with_retry(
+    fn, *args, tries=5, base=0.5, max_wait=30, retry_5xx=True, **kwargs
+):
+    """Call a gspread function, retrying rate limits and server errors.
+
+    Waits follow the server's Retry-After header when present, otherwise
+    jittered exponential backoff, capped at `max_wait` seconds each.
+    Pass retry_5xx=False for non-idempotent calls (appends, inserts): a 5xx
+    may arrive after Sheets already applied the write, so only 429s, which
+    are rejected before any change is made, are retried.
+    """
+    for attempt in range(tries):
+        try:
+            return fn(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            status = e.response.status_code
+            retryable = status == 429 or (retry_5xx and status >= 500)
+            if not retryable or attempt == tries - 1:
+                raise
+            retry_after = e.response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                wait = int(retry_after)
+            else:
+                wait = base * 2**attempt + random.random() * 0.25
+            time.sleep(min(wait, max_wait))
 
-EXPECTED_COLUMNS = [
-    "Issue ID",
-    "Date Reported",
-    "Reported By",
-    "Category",
-    "Subcategory",
-    "Lab Section",
-    "Species",
-    "Description",
-    "Action Taken",
-    "Resolution Date",
-    "Notes",
-]
+
+@st.cache_resource(show_spinner=False)
+def get_sheet():
+    """Authorized worksheet handle, opened once per server process."""
+    # uses secrets.toml: [gcp_service_account] {...}
+    creds = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES,
+    )
+    client = gspread.authorize(creds)
+    # Prefer the spreadsheet ID: open_by_key() skips the Drive title search
+    sheet_id = st.secrets.get("sheet_id")
+    if sheet_id:
+        return _with_retry(client.open_by_key, sheet_id).sheet1
+    return _with_retry(client.open, SHEET_NAME).sheet1
 
 
-def _ensure_header(sheet):
+def _ensure_header(sheet, existing):
     """Make sure the first row contains the expected header."""
-    existing = sheet.row_values(1)
     if not existing:
         # Empty sheet -> write header
-        sheet.insert_row(EXPECTED_COLUMNS, 1)
+        _with_retry(sheet.insert_row, EXPECTED_COLUMNS, 1, retry_5xx=False)
     else:
         # If headers differ, we still assume first row is header
         pass
 
 
-def load_issues():
-    """Load issues from Google Sheets into a DataFrame."""
-    sheet = client.open(SHEET_NAME).sheet1
-    _ensure_header(sheet)
-    data = sheet.get_all_records()
-    if not data:
-        df = pd.DataFrame(columns=EXPECTED_COLUMNS)
-    else:
-        df = pd.DataFrame(data)
-        # ensure all expected columns exist
-        for col in EXPECTED_COLUMNS:
-            if col not in df.columns:
-                df[col] = ""
-        df = df[EXPECTED_COLUMNS]
-    return df
+def _as_categorical(series: pd.Series, vocabulary) -> pd.Series:
+    """Categorical over `vocabulary`, plus any other values found in the sheet."""
+    extra = sorted(set(series.dropna()) - set(vocabulary))
+    return series.astype(pd.CategoricalDtype([*vocabulary, *extra]))
+
+
+def _build_haystack(df: pd.DataFrame):
+    """One lowercase string per issue, all columns joined, for searching."""
+    cols = [df[c].astype("string[pyarrow]").fillna("") for c in EXPECTED_COLUMNS]
+    # Newline separator so a query can't match across two columns
+    haystack = cols[0].str.cat(cols[1:], sep="\n").str.lower()
+    return pa.array(haystack)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_issues_cached(version: int):
+    """Fetch issues from Google Sheets; `version` only keys the cache.
+
+    Returns (frame, search haystack, snapshot id). The haystack is built
+    here so it always expires with the frame it indexes, and the snapshot
+    id changes on every refetch, even when the version does not.
+    """
+    sheet = get_sheet()
+    # Header and data rows in a single values.batchGet round-trip
+    last_col = rowcol_to_a1(1, len(EXPECTED_COLUMNS)).rstrip("1")
+    header_range, data_range = _with_retry(
+        sheet.spreadsheet.values_batch_get,
+        [
+            absolute_range_name(sheet.title, f"A1:{last_col}1"),
+            absolute_range_name(sheet.title, f"A2:{last_col}"),
+        ],
+    )["valueRanges"]
+    header = header_range.get("values", [[]])[0]
+    _ensure_header(sheet, header)
+    # Match columns by the sheet's own header names, as get_all_records()
+    # did; blank header cells fall back to the expected name
+    columns = [
+        header[i] if i < len(header) and header[i] else name
+        for i, name in enumerate(EXPECTED_COLUMNS)
+    ]
+    # Sheets drops trailing empty cells, so pad every row to full width
+    rows = [
+        row + [""] * (len(columns) - len(row))
+        for row in data_range.get("values", [])
+    ]
+    df = pd.DataFrame(rows, columns=columns).reindex(
+        columns=EXPECTED_COLUMNS, fill_value=""
+    )
+    # Numeric IDs only when every non-blank one is an integer; otherwise a
+    # hand-typed ID like "A-12" would become NA and save_issues() would
+    # write it back blank, so keep the column as entered
+    ids = pd.to_numeric(df["Issue ID"], errors="coerce")
+    if ids.notna().eq(df["Issue ID"].str.strip().ne("")).all() and (
+        ids.dropna() % 1 == 0
+    ).all():
+        df["Issue ID"] = ids.astype("Int64")
+    df["Category"] = _as_categorical(df["Category"], CATEGORIES)
+    # Arrow-backed columns: contiguous storage and Arrow's string kernels
+    df = df.convert_dtypes(dtype_backend="pyarrow")
+    return df, _build_haystack(df), time.time_ns()
 
 
-def save_issues(df: pd.DataFrame):
-    """Write the DataFrame back to Google Sheets (overwrite all rows)."""
-    sheet = client.open(SHEET_NAME).sheet1
-    sheet.clear()
-    sheet.update(
-        [EXPECTED_COLUMNS] + df[EXPECTED_COLUMNS].astype(str).values.tolist()
-    )
+@st.cache_resource(show_spinner=False)
+def _sheet_state():
+    """Data version and write locks shared by every session in this process."""
+    return {"version": 0, "lock": threading.Lock(), "id_lock": threading.Lock()}
 
 
-# ---------- STATIC DROPDOWNS ----------
-lab_sections = [
-    "Avian",
-    "Bacteriology",
-    "Canine Genetics",
-    "Contracted Tests",
-    "Histology",
-    "IHC - Obsolete DON'T USE",
-    "Molecular Diagnostics",
-    "Other Services",
-    "Parasitology",
-    "Pathology",
-    "Proficiency Tests",
-    "Serology",
-    "SIPAC Avian",
-    "SIPAC Bacteriology",
-    "SIPAC Parasitology",
-    "SIPAC Virology",
-    "Special Stains-Obsolete",
-    "Toxicology",
-    "TSE",
-    "Virology",
-]
+def sheet_version() -> int:
+    """Current data version; keys every cache derived from the sheet."""
+    return _sheet_state()["version"]
 
-species_list = [
-    "Cervid",
-    "Avian",
-    "Bovine",
-    "Canine",
-    "Equine",
-    "Feline",
-    "Caprine",
-    "Lab An.",
-    "Camelid",
-    "Non An.",
-    "Ovine",
-    "Porcine",
-    "Aquatic",
-    "Unspecified",
-    "Unknown",
-    "Miscellaneous",
-]
 
-mailing_room_issues = [
-    "Missing Sample",
-    "Missing Submission Form",
-    "Broken Sample",
-    "Broken Box",
-    "Inappropriate Specimen",
-    "No/Incorrect Test Marked",
-    "No/Incorrect Species Marked",
-    "No History",
-    "Blank Submission Form",
-    "No/Incorrect Premise ID",
-    "Check",
-    "No Owner",
-    "No Vet",
-    "Test Suggestion",
-    "Other",
-]
+def refresh_issues():
+    """Invalidate cached issues for all sessions; next load hits Google Sheets."""
+    state = _sheet_state()
+    with state["lock"]:
+        state["version"] += 1
+
+
+def load_issues():
+    """Load (frame, haystack, snapshot id), served from cache for up to 60s.
+
+    st.cache_data hands back a fresh copy on every call, so callers may
+    mutate the result without touching the cached frame.
+    """
+    return _load_issues_cached(sheet_version())
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_csv_gz(version: int) -> bytes:
+    """Serialize the issues for `version` to gzipped CSV bytes for download."""
+    csv = _load_issues_cached(version)[0].to_csv(index=False)
+    return gzip.compress(csv.encode("utf-8"))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def build_xlsx(version: int) -> bytes:
+    """Serialize the issues for `version` to .xlsx bytes for download."""
+    df = _load_issues_cached(version)[0]
+    # write_only streams rows out without building per-cell style objects
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(df.columns))
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+@st.cache_data(ttl=60, max_entries=100, show_spinner=False)
+def search_mask(_haystack, snapshot: int, query: str):
+    """Boolean row mask of issues containing every word of `query`.
+
+    Matching is case-insensitive and by substring, so partially typed
+    words still match. Cached per (snapshot, query); the haystack itself
+    is not hashed.
+    """
+    terms = query.lower().split() or [""]
+    mask = pc.match_substring(_haystack, terms[0])
+    for term in terms[1:]:
+        mask = pc.and_(mask, pc.match_substring(_haystack, term))
+    return mask.to_numpy(zero_copy_only=False)
+
+
+def _explode(df: pd.DataFrame, column: str, vocabulary) -> pd.DataFrame:
+    """Long-format (Category, value) rows for a ", "-joined multi-select column."""
+    values = df[column].astype(str).replace("", pd.NA).dropna().str.split(", ")
+    long = df.loc[values.index, ["Category"]].assign(**{column: values})
+    long = long.explode(column)
+    long[column] = _as_categorical(long[column], vocabulary)
+    return long
+
+
+def _counts(long: pd.DataFrame, column: str) -> pd.Series:
+    """Counts per value present in a long-format frame, largest first."""
+    return long.groupby(column, observed=True).size().sort_values(ascending=False)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def analytics(version: int) -> dict:
+    """Dashboard aggregates for `version`, computed once per data change."""
+    df = _load_issues_cached(version)[0]
+    subcategories = _explode(
+        df,
+        "Subcategory",
+        tuple(
+            dict.fromkeys(o for opts in SUBCATEGORY_OPTIONS.values() for o in opts)
+        ),
+    )
+    total = len(df)
+    # Parsed only for counting; the frame keeps the text as entered, so
+    # notes like "pending" still show up in views and exports
+    resolution_dates = pd.to_datetime(
+        df["Resolution Date"], format="mixed", errors="coerce"
+    )
+    resolved = int(resolution_dates.notna().sum())
+    return {
+        "total": total,
+        "resolved": resolved,
+        "open": total - resolved,
+        "resolution_rate": resolved / total * 100 if total else 0.0,
+        "by_category": _counts(df, "Category"),
+        "by_lab_section": _counts(
+            _explode(df, "Lab Section", LAB_SECTIONS), "Lab Section"
+        ),
+        "by_species": _counts(_explode(df, "Species", SPECIES), "Species"),
+        "mailing_room": _counts(
+            subcategories[subcategories["Category"] == "Mailing Room"], "Subcategory"
+        ),
+        "client_comm": _counts(
+            subcategories[subcategories["Category"] == "Client Communication"],
+            "Subcategory",
+        ),
+    }
+
+
+class IssueIdNotWritten(Exception):
+    """The issue row was appended, but its Issue ID could not be written."""
+
+    def __init__(self, row, issue_id=None):
+        super().__init__(f"Issue saved in sheet row {row} without an Issue ID")
+        self.row = row
+        self.issue_id = issue_id
+
+
+def append_issue(row_dict: dict) -> int:
+    """Append an issue as a new row at the bottom of the sheet.
+
+    values.append is atomic on Google's side, so simultaneous submissions
+    each land on their own row; the Issue ID is derived from that row
+    unless it is already taken, in which case it gets max + 1. That
+    fallback is a read-modify-write on column A: it is serialized within
+    this server process, but a writer in another process can still pick
+    the same ID. Raises IssueIdNotWritten if the row was saved but its ID
+    could not be filled in.
+    """
+    sheet = get_sheet()
+    response = _with_retry(
+        sheet.append_rows,
+        [[""] + [str(row_dict[c]) for c in EXPECTED_COLUMNS[1:]]],
+        value_input_option="RAW",
+        insert_data_option="INSERT_ROWS",
+        table_range="A1",
+        retry_5xx=False,
+    )
+    # e.g. "Sheet1!A37:K37" -> row 37 -> Issue ID 36 (row 1 is the header)
+    updated_range = response["updates"]["updatedRange"]
+    row, _ = a1_to_rowcol(updated_range.split("!")[-1].split(":")[0])
+    issue_id = None
+    try:
+        # The row position can clash with an existing ID (rows deleted by
+        # hand, or the append landed above a blank gap): use max + 1 then.
+        # Held until the ID is written so concurrent sessions see it
+        with _sheet_state()["id_lock"]:
+            ids = [
+                int(x) for x in _with_retry(sheet.col_values, 1)[1:] if x.isdigit()
+            ]
+            issue_id = row - 1
+            if issue_id in ids:
+                issue_id = max(ids) + 1
+            _with_retry(sheet.update_cell, row, 1, issue_id)
+    except gspread.exceptions.APIError as e:
+        raise IssueIdNotWritten(row, issue_id) from e
+    finally:
+        refresh_issues()
+    return issue_id
 
-client_comm_issues = [
-    "Result Interpretation",
-    "Turnaround Time",
-    "Sample Submission",
-    "Consultation for Testing",
-    "Fees",
-    "Other",
-]
 
-# ---------- LOAD DATA FROM GOOGLE SHEETS ----------
-df = load_issues()
+def save_issues(df: pd.DataFrame):
+    """Write the DataFrame back to Google Sheets (overwrite all rows).
+
+    Only needed for bulk rewrites; new issues go through append_issue().
+    """
+    sheet = get_sheet()
+    # Go through object dtype first: Arrow-backed columns can't take "" as a
+    # fill value (e.g. a missing Issue ID in an int64[pyarrow] column)
+    out = df[EXPECTED_COLUMNS].astype(object)
+    rows = out.where(out.notna(), "").to_numpy().tolist()
+    _with_retry(sheet.clear)
+    _with_retry(
+        sheet.update,
+        [EXPECTED_COLUMNS] + rows,
+        value_input_option="RAW",
+    )
+    refresh_issues()
+
 
 # ---------- PAGE CONFIG ----------
 st.set_page_config(page_title="ADDL Issue Tracker", layout="wide")
@@ -164,13 +352,24 @@ page = st.sidebar.radio(
 if page == "Add New Issue":
     st.subheader("📝 Add a New Issue")
 
-    # Initialize session state for showing success message and form reset
+    # Widget keys of every input on this page, dropped to reset the fields
+    field_keys = (
+        "reported_by",
+        "category",
+        *(f"subcategory_{c}" for c in SUBCATEGORY_OPTIONS),
+        "lab_section",
+        "species",
+        "description",
+        "action_taken",
+        "resolution_date",
+        "notes",
+    )
+
+    # Initialize session state for showing success message
     if "show_success" not in st.session_state:
         st.session_state.show_success = False
     if "last_issue_id" not in st.session_state:
         st.session_state.last_issue_id = None
-    if "form_key" not in st.session_state:
-        st.session_state.form_key = 0
 
     # Show success message if issue was just added
     if st.session_state.show_success:
@@ -179,32 +378,25 @@ if page == "Add New Issue":
         )
         st.balloons()
         st.session_state.show_success = False
-        st.session_state.form_key += 1  # Increment to clear all fields
+        for key in field_keys:  # Clear all fields
+            st.session_state.pop(key, None)
 
-    # Inputs with unique keys tied to form_key
-    reported_by = st.text_input(
-        "Reported By (Your Name)",
-        key=f"reported_by_{st.session_state.form_key}",
-    )
+    # Category and subcategory stay outside the form so the pickers
+    # below can react to the selected category right away
+    reported_by = st.text_input("Reported By (Your Name)", key="reported_by")
     category = st.selectbox(
         "Category *",
-        ["— Select —", "Mailing Room", "Client Communication", "Lab Section", "Other"],
-        key=f"category_{st.session_state.form_key}",
+        ("— Select —", *CATEGORIES),
+        key="category",
     )
 
     # Subcategory pickers appear dynamically
     subcategory = []
-    if category == "Mailing Room":
-        subcategory = st.multiselect(
-            "Mailing Room Issue Type(s) *",
-            mailing_room_issues,
-            key=f"subcategory_mr_{st.session_state.form_key}",
-        )
-    elif category == "Client Communication":
+    if category in SUBCATEGORY_OPTIONS:
         subcategory = st.multiselect(
-            "Client Communication Issue Type(s) *",
-            client_comm_issues,
-            key=f"subcategory_cc_{st.session_state.form_key}",
+            f"{category} Issue Type(s) *",
+            SUBCATEGORY_OPTIONS[category],
+            key=f"subcategory_{category}",
         )
     elif category == "Lab Section":
         st.info(
@@ -213,55 +405,53 @@ if page == "Add New Issue":
     elif category == "Other":
         st.info("💡 Please provide details in the Description field below.")
 
-    st.markdown("---")
-    lab_section = st.multiselect(
-        "Lab Section(s) (Optional)",
-        lab_sections,
-        key=f"lab_section_{st.session_state.form_key}",
-    )
-    species = st.multiselect(
-        "Species Involved (Optional)",
-        species_list,
-        key=f"species_{st.session_state.form_key}",
-    )
+    # The rest is batched in a form: typing here doesn't rerun the script
+    with st.form("add_issue", border=False):
+        st.markdown("---")
+        lab_section = st.multiselect(
+            "Lab Section(s) (Optional)",
+            LAB_SECTIONS,
+            key="lab_section",
+        )
+        species = st.multiselect(
+            "Species Involved (Optional)",
+            SPECIES,
+            key="species",
+        )
 
-    st.markdown("---")
-    description = st.text_area(
-        "Issue Description *",
-        help="Required: Describe the issue in detail",
-        key=f"description_{st.session_state.form_key}",
-    )
-    action_taken = st.text_area(
-        "Action Taken (if any)",
-        key=f"action_taken_{st.session_state.form_key}",
-    )
-    resolution_date = st.date_input(
-        "Resolution Date (if resolved)",
-        value=None,
-        key=f"resolution_date_{st.session_state.form_key}",
-    )
-    notes = st.text_area(
-        "Notes or Comments", key=f"notes_{st.session_state.form_key}"
-    )
+        st.markdown("---")
+        description = st.text_area(
+            "Issue Description *",
+            help="Required: Describe the issue in detail",
+            key="description",
+        )
+        action_taken = st.text_area(
+            "Action Taken (if any)",
+            key="action_taken",
+        )
+        resolution_date = st.date_input(
+            "Resolution Date (if resolved)",
+            value=None,
+            key="resolution_date",
+        )
+        notes = st.text_area("Notes or Comments", key="notes")
+
+        submitted = st.form_submit_button(
+            "Add Issue", type="primary", use_container_width=True
+        )
 
-    if st.button("Add Issue", type="primary", use_container_width=True):
+    if submitted:
         if category == "— Select —":
             st.error("⚠️ Please select a Category before adding the issue.")
         elif not description.strip():
             st.error("⚠️ Please provide an Issue Description.")
-        elif category in ["Mailing Room", "Client Communication"] and not subcategory:
+        elif category in SUBCATEGORY_OPTIONS and not subcategory:
             st.error(
                 f"⚠️ Please select at least one subcategory for {category}."
             )
         else:
             with st.spinner("Adding issue..."):
-                # reload latest (in case someone else added meanwhile)
-                df = load_issues()
-
-                new_issue_id = int(df["Issue ID"].max()) + 1 if not df.empty else 1
-
                 new_issue = {
-                    "Issue ID": new_issue_id,
                     "Date Reported": datetime.now(LOCAL_TZ).strftime(
     "%Y-%m-%d %H:%M:%S"
 ),
@@ -282,10 +472,15 @@ if page == "Add New Issue":
                     "Notes": notes,
                 }
 
-                df = pd.concat(
-                    [df, pd.DataFrame([new_issue])], ignore_index=True
-                )
-                save_issues(df)
+                try:
+                    new_issue_id = append_issue(new_issue)
+                except IssueIdNotWritten as e:
+                    st.error(
+                        f"⚠️ Your issue was saved (sheet row {e.row}), but its "
+                        "Issue ID could not be written. Please do NOT submit it "
+                        "again; ask the sheet owner to fill in the ID."
+                    )
+                    st.stop()
 
                 st.session_state.last_issue_id = new_issue_id
                 st.session_state.show_success = True
@@ -296,39 +491,44 @@ if page == "Add New Issue":
 elif page == "View Issues":
     st.subheader("📋 All Issues")
 
-    # Always load latest data from Sheets
-    df = load_issues()
+    # Cached per sheet version; "Refresh Data" forces a fresh read
+    df, haystack, snapshot = load_issues()
 
-    col1, col2, col3 = st.columns([3, 1, 1])
+    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
     with col1:
         search = st.text_input(
             "🔍 Search by keyword:", placeholder="Type to filter issues..."
         )
     with col2:
         if st.button("🔄 Refresh Data"):
-            df = load_issues()
+            refresh_issues()
+            df, haystack, snapshot = load_issues()
             st.success("Data refreshed from Google Sheets!")
     with col3:
-        # Download current view as Excel
-        buffer = io.BytesIO()
-        df.to_excel(buffer, index=False)
-        buffer.seek(0)
+        # Download current view as gzipped CSV (small and fast to build)
         st.download_button(
             label="📥 Download",
-            data=buffer,
-            file_name=f"issues_backup_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            data=build_csv_gz(sheet_version()),
+            file_name=f"issues_backup_{datetime.now().strftime('%Y%m%d')}.csv.gz",
+            mime="application/gzip",
         )
+    with col4:
+        # Excel is only generated once somebody asks for it
+        if st.session_state.get("xlsx_requested"):
+            st.download_button(
+                label="📥 Excel",
+                data=build_xlsx(sheet_version()),
+                file_name=f"issues_backup_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        else:
+            st.button(
+                "📊 Prepare Excel",
+                on_click=lambda: st.session_state.update(xlsx_requested=True),
+            )
 
     if search:
-        filtered = df[
-            df.apply(
-                lambda row: row.astype(str)
-                .str.contains(search, case=False)
-                .any(),
-                axis=1,
-            )
-        ]
+        filtered = df[search_mask(haystack, snapshot, search)]
     else:
         filtered = df
 
@@ -344,30 +544,25 @@ elif page == "View Issues":
 elif page == "Analytics Dashboard":
     st.subheader("📊 Analytics Summary")
 
-    df = load_issues()
+    stats = analytics(sheet_version())
 
-    if not df.empty:
+    if stats["total"]:
         # ---------- Top metrics ----------
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Issues", len(df))
+            st.metric("Total Issues", stats["total"])
         with col2:
-            resolved = df["Resolution Date"].astype(str).str.len() > 0
-            resolved_count = resolved.sum()
-            st.metric("Resolved Issues", int(resolved_count))
+            st.metric("Resolved Issues", stats["resolved"])
         with col3:
-            open_issues = len(df) - int(resolved_count)
-            st.metric("Open Issues", open_issues)
+            st.metric("Open Issues", stats["open"])
         with col4:
-            if len(df) > 0:
-                resolution_rate = (resolved_count / len(df)) * 100
-                st.metric("Resolution Rate", f"{resolution_rate:.1f}%")
+            st.metric("Resolution Rate", f"{stats['resolution_rate']:.1f}%")
 
         st.markdown("---")
 
         # ---------- Category breakdown ----------
         st.subheader("Issues by Category")
-        st.bar_chart(df["Category"].value_counts())
+        st.bar_chart(stats["by_category"])
 
         st.markdown("---")
 
@@ -376,33 +571,15 @@ elif page == "Analytics Dashboard":
 
         with col1:
             st.subheader("Issues by Lab Section")
-            if df["Lab Section"].astype(str).str.len().any():
-                lab_counts = (
-                    df["Lab Section"]
-                    .astype(str)
-                    .replace("", pd.NA)
-                    .dropna()
-                    .str.split(", ")
-                    .explode()
-                    .value_counts()
-                )
-                st.bar_chart(lab_counts)
+            if not stats["by_lab_section"].empty:
+                st.bar_chart(stats["by_lab_section"])
             else:
                 st.info("No lab section data available yet.")
 
         with col2:
             st.subheader("Issues by Species")
-            if df["Species"].astype(str).str.len().any():
-                species_counts = (
-                    df["Species"]
-                    .astype(str)
-                    .replace("", pd.NA)
-                    .dropna()
-                    .str.split(", ")
-                    .explode()
-                    .value_counts()
-                )
-                st.bar_chart(species_counts)
+            if not stats["by_species"].empty:
+                st.bar_chart(stats["by_species"])
             else:
                 st.info("No species data available yet.")
 
@@ -414,41 +591,18 @@ elif page == "Analytics Dashboard":
         # Mailing Room subcategory breakdown
         with col1:
             st.subheader("Mailing Room Issue Types")
-            mr_df = df[df["Category"] == "Mailing Room"]
-            if not mr_df.empty and mr_df["Subcategory"].astype(str).str.len().any():
-                mr_counts = (
-                    mr_df["Subcategory"]
-                    .astype(str)
-                    .replace("", pd.NA)
-                    .dropna()
-                    .str.split(", ")
-                    .explode()
-                    .value_counts()
-                )
-                st.bar_chart(mr_counts)
+            if not stats["mailing_room"].empty:
+                st.bar_chart(stats["mailing_room"])
             else:
                 st.info("No Mailing Room issues logged yet.")
 
         # Client Communication subcategory breakdown
         with col2:
             st.subheader("Client Communication Issue Types")
-            cc_df = df[df["Category"] == "Client Communication"]
-            if not cc_df.empty and cc_df["Subcategory"].astype(str).str.len().any():
-                cc_counts = (
-                    cc_df["Subcategory"]
-                    .astype(str)
-                    .replace("", pd.NA)
-                    .dropna()
-                    .str.split(", ")
-                    .explode()
-                    .value_counts()
-                )
-                st.bar_chart(cc_counts)
+            if not stats["client_comm"].empty:
+                st.bar_chart(stats["client_comm"])
             else:
                 st.info("No Client Communication issues logged yet.")
 
     else:
         st.info("📭 No data yet. Start by adding your first issue!")
-
-
-